@@ -0,0 +1,88 @@
+# many-client throughput benchmark for the SO_REUSEPORT receiver (multi_receiver.py)
+#
+#   python bench_multi_receiver.py --clients 16 --size 200000 --workers 1 2 4
+#
+# for each worker count, starts a fresh receiver plus `clients` sender processes that each push `size` bytes,
+# then reports aggregate receive throughput and the speedup over the first worker count. throughput should
+# grow with workers until it runs out of cores (senders compete for the same CPUs on a single machine)
+
+import argparse
+import os
+import sys
+import time
+
+DEFAULT_PORT = 9101
+EXIT_GRACE = 3.0 # seconds to keep collecting stats after the last sender exits (workers finish on the last FIN/ACK)
+
+
+def sender_main(port: int, size: int):
+    sys.stdout = open(os.devnull, "w") # the sender logs every ACK, which would dominate the measurement
+    from rdt import client_connect
+
+    conn = client_connect(local_addr=("127.0.0.1", 0), remote_addr=("127.0.0.1", port))
+    conn.send_data(b"x" * size)
+    conn.close()
+
+
+def run_once(workers: int, clients: int, size: int, port: int) -> dict:
+    import multiprocessing
+    from multi_receiver import run_workers
+
+    ctx = multiprocessing.get_context("fork")
+    senders = [ctx.Process(target=sender_main, args=(port, size)) for _ in range(clients)]
+    all_exited_at = None
+
+    def start_senders(): # only once every worker has bound the port
+        for proc in senders:
+            proc.start()
+
+    def senders_done():
+        # a sender that gives up in client_connect never produces a stats record, so stop waiting
+        # shortly after every sender has exited instead of relying on the connection count alone
+        nonlocal all_exited_at
+        if not senders or any(proc.pid is None or proc.is_alive() for proc in senders):
+            return False
+        if all_exited_at is None:
+            all_exited_at = time.time()
+        return time.time() - all_exited_at > EXIT_GRACE
+
+    try:
+        totals = run_workers(("127.0.0.1", port), workers, connections=clients, quiet=True,
+                             on_ready=start_senders, stop_when=senders_done)
+    finally:
+        for proc in senders:
+            if proc.pid is not None:
+                proc.join()
+    totals["failed_senders"] = sum(1 for proc in senders if proc.exitcode != 0)
+    return totals
+
+
+def main(argv=None):
+    from multi_receiver import throughput
+
+    parser = argparse.ArgumentParser(description="Measure aggregate receive throughput against worker count")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent sender processes")
+    parser.add_argument("--size", type=int, default=200000, help="bytes each sender transfers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1],
+                        help="worker counts to compare (default: 1 and one per core)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="UDP port for the receiver")
+    args = parser.parse_args(argv)
+
+    print(f"{args.clients} clients x {args.size} bytes, {os.cpu_count()} cores")
+    baseline = None
+    for workers in args.workers:
+        totals = run_once(workers, args.clients, args.size, args.port)
+        rate = throughput(totals)
+        baseline = baseline or rate
+        per_worker = ", ".join(str(w["connections"]) for w in totals["per_worker"])
+        speedup = rate / baseline if baseline else 0.0
+        print(f"workers={workers:<3} {rate / 1024:9.1f} KB/s  x{speedup:.2f}  "
+              f"(connections per worker: {per_worker}; {totals['incomplete']} timed out)")
+        missing = args.clients - totals["connections"]
+        if missing > 0 or totals["failed_senders"]:
+            print(f"    {missing} connections missing, {totals['failed_senders']} senders failed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
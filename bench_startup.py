@@ -0,0 +1,119 @@
+# cold-start benchmark: measures import cost of the RDT modules with `python -X importtime`
+#
+#   python bench_startup.py              # report the slowest imports and the totals
+#   python bench_startup.py --budget 25  # also fail if importing rdt takes longer than 25 ms
+#
+# the primary check is deterministic: importing rdt must not pull in any of LAZY_MODULES, which the
+# protocol only loads once a packet is built or a handshake starts. the timing budget is a secondary check.
+# each target runs in a fresh interpreter several times and the best run is kept, since cold-start
+# numbers are noisy and the minimum is the most stable estimate of the real cost
+
+import argparse
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# (label, code run under -X importtime)
+TARGETS = [
+    ("transfer (CLI parse only)", "import transfer; transfer.build_parser()"),
+    ("rdt", "import rdt"),
+]
+
+DEFAULT_RUNS = 5
+DEFAULT_BUDGET_MS = 25.0 # cumulative import time allowed for rdt before we call it a regression
+
+# modules rdt defers until first use; any of these showing up under `import rdt` is a regression
+LAZY_MODULES = ("json", "random", "typing")
+
+
+def parse_importtime(stderr: str):
+    # returns {module: cumulative_us} for top-level lines of -X importtime output
+    # lines look like: "import time:   self [us] |  cumulative | imported package"
+    results = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            cumulative = int(fields[1])
+        except ValueError:
+            continue # header line
+        results[fields[2][1:].rstrip()] = cumulative # keep the indentation, it encodes nesting depth
+    return results
+
+
+def measure(code: str):
+    # imports triggered by `code` (cumulative us per module), excluding interpreter startup itself
+    baseline = {name.strip() for name in parse_importtime(run_importtime("pass"))}
+    timings = parse_importtime(run_importtime(code))
+    return {name: us for name, us in timings.items() if name.strip() not in baseline}
+
+
+def run_importtime(code: str) -> str:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=HERE, capture_output=True, text=True, check=True)
+    return proc.stderr
+
+
+def best_of(code: str, runs: int):
+    best = None
+    for _ in range(runs):
+        timings = measure(code)
+        if best is None or top_level_ms(timings) < top_level_ms(best):
+            best = timings
+    return best
+
+
+def eager_lazy_modules(timings) -> list:
+    # names from LAZY_MODULES (or their submodules) that were imported
+    found = []
+    for name in timings:
+        name = name.strip()
+        if name.split(".")[0] in LAZY_MODULES:
+            found.append(name)
+    return found
+
+
+def top_level_ms(timings) -> float:
+    # nested imports are already included in their parent's cumulative time, so only sum top-level ones
+    return sum(us for name, us in timings.items() if not name.startswith(" ")) / 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the RDT modules")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="fresh interpreters per target")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_MS, help="max ms allowed for importing rdt")
+    parser.add_argument("--top", type=int, default=5, help="how many of the slowest imports to list")
+    args = parser.parse_args(argv)
+
+    rdt_ms = None
+    rdt_eager = []
+    for label, code in TARGETS:
+        timings = best_of(code, args.runs)
+        total_ms = top_level_ms(timings)
+        print(f"{label}: {total_ms:.1f} ms")
+        for name, us in sorted(timings.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"    {us / 1000:7.1f} ms  {name.strip()}")
+        if code == "import rdt":
+            rdt_ms = total_ms
+            rdt_eager = eager_lazy_modules(timings)
+
+    failed = False
+    if rdt_eager:
+        print(f"FAIL: importing rdt eagerly imports {', '.join(rdt_eager)}")
+        failed = True
+    if rdt_ms is not None and rdt_ms > args.budget:
+        print(f"FAIL: importing rdt took {rdt_ms:.1f} ms, budget is {args.budget:.1f} ms")
+        failed = True
+    if failed:
+        return 1
+    print(f"OK: importing rdt avoids {', '.join(LAZY_MODULES)} and fits the {args.budget:.1f} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
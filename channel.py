@@ -1,21 +1,30 @@
 # UnreliableChannel wrapper (UDP + random drop/corrupt)
 
+from __future__ import annotations
+
 import socket
-import random
-from typing import Tuple
 
 class UnreliableChannel: # define our own data type to represent the underlying UDP channel
     def __init__(self,
-                local_addr: Tuple[str, int], # (ip, port) to bind this UDP socket
+                local_addr: tuple[str, int], # (ip, port) to bind this UDP socket
                 drop_prob: float = 0.0, # chance of a packet being dropped - implemented manually 
-                corrupt_prob: float = 0.0): # chance of a bit being flipped - implemented manually 
+                corrupt_prob: float = 0.0, # chance of a bit being flipped - implemented manually 
+                reuse_port: bool = False): # let several processes bind local_addr, the kernel spreads flows across them
 
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if reuse_port:
+            if not hasattr(socket, "SO_REUSEPORT"):
+                raise RuntimeError("SO_REUSEPORT is not supported on this platform")
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self.sock.bind(local_addr)
         self.drop_prob = drop_prob
         self.corrupt_prob = corrupt_prob
     
-    def sendto(self, data: bytes, addr: Tuple[str, int]):
+    def sendto(self, data: bytes, addr: tuple[str, int]):
+        if not (self.drop_prob or self.corrupt_prob): # lossless channel: skip the rng (and its import) entirely
+            return self.sock.sendto(data, addr)
+
+        import random
         r = random.random()
         if r < self.drop_prob: # condition for dropping a packet 
             return 0 # nothing is sent: simulates packet loss 
@@ -29,7 +38,7 @@ class UnreliableChannel: # define our own data type to represent the underlying
         # if packet is not dropped or corrupted it gets sent properly
         return self.sock.sendto(data, addr)
     
-    def recvfrom(self, bufsize: int = 4096) -> Tuple[bytes, [Tuple[str, int]]]:
+    def recvfrom(self, bufsize: int = 4096) -> tuple[bytes, tuple[str, int]]:
         data, addr = self.sock.recvfrom(bufsize) # I assume sock.recvfrom is diff from the recvfrom defined here
         return data, addr
 
@@ -0,0 +1,149 @@
+# multi-core receiver: N forked worker processes bind the same UDP port with SO_REUSEPORT
+#
+#   python transfer.py serve --port 9001 --workers 4
+#
+# the kernel hashes each flow's 4-tuple onto one of the bound sockets, so a sender always lands on the same
+# worker and each worker keeps its own connection table (rdt.server_serve). workers report over a pipe:
+# ("ready", None) once bound, ("closed", stats) for every finished connection and ("failed", reason) if
+# server_serve raises. the parent aggregates per-worker and total stats
+
+import os
+
+POLL_INTERVAL = 0.5 # seconds between stop_when checks while waiting on the pipes
+
+
+def worker_main(index: int, local_addr, writer, options: dict):
+    from rdt import server_serve
+
+    def on_ready():
+        writer.send(("ready", None))
+
+    def on_close(stats):
+        stats["worker"] = index
+        stats["pid"] = os.getpid()
+        writer.send(("closed", stats))
+
+    try:
+        server_serve(local_addr, on_close, reuse_port=True, on_ready=on_ready, **options)
+    except KeyboardInterrupt:
+        pass # parent handles Ctrl+C and prints the summary
+    except Exception as exc:
+        writer.send(("failed", f"{type(exc).__name__}: {exc}"))
+    finally:
+        writer.close()
+
+
+def start_workers(ctx, local_addr, workers: int, options: dict):
+    procs = []
+    readers = {} # read end of the pipe -> worker index
+    for index in range(workers):
+        reader, writer = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=worker_main, args=(index, local_addr, writer, options), daemon=True)
+        proc.start()
+        writer.close() # parent keeps only the read end, so a dead worker shows up as EOF
+        procs.append(proc)
+        readers[reader] = index
+    return procs, readers
+
+
+def receive(reader, index: int, procs):
+    # next message from a worker, with EOF (the worker died without reporting) turned into a "failed" event
+    try:
+        return reader.recv()
+    except EOFError:
+        procs[index].join()
+        return "failed", f"exited unexpectedly with code {procs[index].exitcode}"
+
+
+def stop_workers(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        proc.join()
+
+
+def run_workers(local_addr, workers: int, connections: int = None, quiet: bool = False,
+                on_ready=None, stop_when=None, **options) -> dict:
+    # fork `workers` receivers on local_addr and aggregate their stats until `connections` have finished
+    # (or forever, until Ctrl+C, when connections is None); returns the aggregated totals
+    # on_ready is called once every worker has bound the port: senders started any earlier could be
+    # rehashed onto a late-joining worker that has no connection-table entry for them.
+    # stop_when, if given, is polled every POLL_INTERVAL seconds and ends the run early when it returns True
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+    import multiprocessing
+    from multiprocessing.connection import wait
+
+    procs, readers = start_workers(multiprocessing.get_context("fork"), local_addr, workers, options)
+    ready = set()
+
+    totals = {
+        "connections": 0,
+        "incomplete": 0,
+        "bytes": 0,
+        "packets": 0,
+        "started": None,
+        "finished": None,
+        "per_worker": [{"connections": 0, "bytes": 0, "packets": 0} for _ in range(workers)],
+    }
+    try:
+        while connections is None or totals["connections"] < connections:
+            if stop_when is not None and stop_when():
+                break
+            for reader in wait(list(readers), timeout=POLL_INTERVAL if stop_when is not None else None):
+                event, stats = receive(reader, readers[reader], procs)
+                if event == "ready":
+                    ready.add(reader)
+                    if len(ready) == workers:
+                        if not quiet:
+                            print(f"[server] {workers} workers listening on {local_addr[0]}:{local_addr[1]} "
+                                  "(SO_REUSEPORT)")
+                        if on_ready is not None:
+                            on_ready()
+                    continue
+                if event == "failed":
+                    # its flows would be rehashed onto the remaining workers mid-transfer, so don't limp on
+                    raise RuntimeError(f"Receiver worker {readers[reader]} failed: {stats}")
+
+                worker = totals["per_worker"][stats["worker"]]
+                worker["connections"] += 1
+                worker["bytes"] += stats["bytes"]
+                worker["packets"] += stats["packets"]
+                totals["connections"] += 1
+                totals["bytes"] += stats["bytes"]
+                totals["packets"] += stats["packets"]
+                if not stats["complete"]:
+                    totals["incomplete"] += 1
+                if totals["started"] is None or stats["started"] < totals["started"]:
+                    totals["started"] = stats["started"]
+                if totals["finished"] is None or stats["finished"] > totals["finished"]:
+                    totals["finished"] = stats["finished"]
+
+                if not quiet:
+                    status = "closed" if stats["complete"] else "timed out"
+                    print(f"[server] worker {stats['worker']}: conn {stats['conn_id']} from {stats['remote_addr']} "
+                          f"{status}, {stats['bytes']} bytes in {stats['packets']} packets")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_workers(procs)
+
+    if not quiet:
+        print_summary(totals)
+    return totals
+
+
+def throughput(totals: dict) -> float:
+    # aggregate bytes/second from the first connection's start to the last one's finish
+    if totals["started"] is None:
+        return 0.0
+    elapsed = totals["finished"] - totals["started"]
+    return totals["bytes"] / elapsed if elapsed > 0 else 0.0
+
+
+def print_summary(totals: dict):
+    for index, worker in enumerate(totals["per_worker"]):
+        print(f"[server] worker {index}: {worker['connections']} connections, {worker['bytes']} bytes, "
+              f"{worker['packets']} packets")
+    print(f"[server] Total: {totals['connections']} connections ({totals['incomplete']} timed out), "
+          f"{totals['bytes']} bytes, {throughput(totals) / 1024:.1f} KB/s")
@@ -1,15 +1,18 @@
 # encode/decode our protocol packet - will be a python dict
 
-import json
-from typing import Dict, Any
+# json is imported inside the functions that need it so importing this module stays cheap
+from __future__ import annotations
+
+DELIM = b"\n\n" # delimiter between header and payload so we can split later
 
 def make_packet(conn_id: int, # connection id
                 seq: int, # sequence number
                 ack: int, # ack number - latest in order recieved + 1
-                flags: Dict[str, bool], # flags are SYN, ACK, FIN, DATA - explained in sender_app.py
+                flags: dict[str, bool], # flags are SYN, ACK, FIN, DATA - explained in sender_app.py
                 rwnd: int, # receiver-side window size 
                 payload: bytes # the content of the packet that isn't headers
                 ): # -> bytes
+    import json
     header = {
         "conn_id": conn_id,
         "seq": seq, 
@@ -18,12 +21,23 @@ def make_packet(conn_id: int, # connection id
         "rwnd": rwnd,
     }
     header_bytes = json.dumps(header).encode("utf-8")
-    delim = b"\n\n" # delimiter between header and payload so we can split later
-    return header_bytes + delim + payload 
+    return header_bytes + DELIM + payload 
+
+def make_header_template(flags: dict[str, bool]) -> bytes:
+    # precompute the header bytes for a fixed set of flags, leaving %d slots for conn_id, seq, ack and rwnd
+    # the output is byte-for-byte what make_packet produces, minus the json.dumps call per packet
+    flags_json = ", ".join(f'"{name}": {"true" if value else "false"}' for name, value in flags.items())
+    header = '{"conn_id": %d, "seq": %d, "ack": %d, "flags": {' + flags_json + '}, "rwnd": %d}'
+    return header.encode("utf-8") + DELIM
+
+def make_packet_from_template(template: bytes, conn_id: int, seq: int, ack: int, rwnd: int,
+                              payload: bytes = b""): # -> bytes
+    return template % (conn_id, seq, ack, rwnd) + payload
 
 def parse_packet(raw: bytes): # -> Dict[str, Any], bytes:
+    import json
     # split JSON header and payload
-    sep = raw.find(b"\n\n")
+    sep = raw.find(DELIM)
     if sep == -1:
         raise ValueError("Invalid packet format: Missing Separator")
     header_bytes = raw[:sep]
@@ -1,13 +1,14 @@
 # Reliable, Pipelined protocol which performs 3-way handshake
 
-import random
+# random is imported inside client_connect/server_accept/server_serve since only the handshake needs it
+from __future__ import annotations
+
 import socket
 from collections import deque
-from typing import Optional, Tuple
 import time 
 
 from channel import UnreliableChannel
-from packet import make_packet, parse_packet
+from packet import make_header_template, make_packet_from_template, parse_packet
 
 N = 4 # num of outstanding packets permitted by go back n
 
@@ -19,11 +20,18 @@ DEFAULT_RECV_BUFFER = 4096 # in bytes, so 4KB (a common socket buffer chunk/used
 MSS = 512  # congestion-control segment size in bytes
 INITIAL_SSTHRESH = 4096  # slow start threshold in bytes
 
+# flag combinations never change, so their header bytes are built once here instead of per packet
+SYN_TEMPLATE = make_header_template({"SYN": True, "ACK": False, "FIN": False, "DATA": False})
+SYNACK_TEMPLATE = make_header_template({"SYN": True, "ACK": True, "FIN": False, "DATA": False})
+ACK_TEMPLATE = make_header_template({"SYN": False, "ACK": True, "FIN": False, "DATA": False})
+FIN_TEMPLATE = make_header_template({"SYN": False, "ACK": False, "FIN": True, "DATA": False})
+DATA_TEMPLATE = make_header_template({"SYN": False, "ACK": False, "FIN": False, "DATA": True})
+
 
 class RDTConnection:
     def __init__(self,
                 channel: UnreliableChannel,
-                remote_addr: Tuple[str,int],
+                remote_addr: tuple[str,int],
                 conn_id: int,
                 send_seq: int, 
                 recv_seq: int,
@@ -72,17 +80,11 @@ class RDTConnection:
 
     # refactored making a data packet into a helper func
     def make_data_packet(self, seq: int, payload_bytes: bytes):
-        flags_data = {
-            "SYN": False,
-            "ACK": False,
-            "FIN": False,
-            "DATA": True,
-        }
-        packet = make_packet(
+        packet = make_packet_from_template(
+            DATA_TEMPLATE,
             conn_id=self.conn_id,
             seq=seq,
             ack=self.recv_seq,
-            flags=flags_data,
             rwnd=self.available_recv_window(), #changed form harcoded 0 to buffer flow control, data stops being sent when its 0
             payload=payload_bytes,
         )
@@ -98,19 +100,12 @@ class RDTConnection:
     def _send_ack_packet(self):
         # send a pure ACK reflecting latest recv_seq/rwnd
         advertised = self.available_recv_window()
-        ack_flags = {
-            "SYN": False,
-            "ACK": True,
-            "FIN": False,
-            "DATA": False,
-        }
-        ack_packet = make_packet(
+        ack_packet = make_packet_from_template(
+            ACK_TEMPLATE,
             conn_id=self.conn_id,
             seq=self.send_seq,
             ack=self.recv_seq,
-            flags=ack_flags,
             rwnd=advertised,
-            payload=b"",
         )
         self.channel.sendto(ack_packet, self.remote_addr)
         self.zero_window_advertised = (advertised == 0)
@@ -129,7 +124,8 @@ class RDTConnection:
             return
 
         # value of last ack will be starting val + payload length 
-        final_ack = self.send_seq + total_len
+        start_seq = self.send_seq # send_seq slides forward as ACKs arrive, so remember where this payload begins
+        final_ack = start_seq + total_len
 
         attempt = 0
         self.last_acked = self.base
@@ -153,7 +149,7 @@ class RDTConnection:
                 if allowance <= 0:
                     break
 
-                offset = self.next_seq - self.send_seq
+                offset = self.next_seq - start_seq
                 segment = payload_bytes[offset : offset + allowance]
 
                 packet = self.send_data_packet(self.next_seq, segment)
@@ -257,7 +253,7 @@ class RDTConnection:
 
         raise RuntimeError("Failed to deliver payload after retransmissions")
 
-    def recv_data(self, timeout: float = 1.0) -> Optional[bytes]:
+    def recv_data(self, timeout: float = 1.0) -> bytes | None:
         # blocking receive that returns payload bytes, None on timeout, b'' on FIN
         while True:
             if self.recv_queue:
@@ -285,33 +281,47 @@ class RDTConnection:
             if addr != self.remote_addr or header.get("conn_id") != self.conn_id:
                 continue
 
-            flags = header.get("flags", {})
+            self.handle_packet(header, payload)
 
-            if flags.get("FIN"):
-                fin_seq = header.get("seq", 0)
-                self.recv_seq = max(self.recv_seq, fin_seq + 1)
-                self.fin_received = True
-                self.state = "CLOSE_WAIT"
-                self._send_ack_packet()
-                continue
+    def handle_packet(self, header: dict, payload: bytes):
+        # process one parsed packet already known to belong to this connection: queue in-order data and ACK it
+        # split out of recv_data so server_serve can feed packets for many connections from one socket
+        flags = header.get("flags", {})
 
-            if flags.get("DATA"):
-                seq = header.get("seq", 0)
-                if seq == self.recv_seq:
-                    if len(payload) > self.available_recv_window():
-                        # buffer full: re-ACK last in-order byte with rwnd=0
-                        self._send_ack_packet()
-                        continue
-                    self.buffer_incoming(len(payload))
-                    self.recv_queue.append(payload)
-                    self.recv_seq += len(payload)
-                    self._send_ack_packet()
-                else:
+        if flags.get("FIN"):
+            fin_seq = header.get("seq", 0)
+            self.recv_seq = max(self.recv_seq, fin_seq + 1)
+            self.fin_received = True
+            self.state = "CLOSE_WAIT"
+            self._send_ack_packet()
+            return
+
+        if flags.get("DATA"):
+            seq = header.get("seq", 0)
+            if seq == self.recv_seq:
+                if len(payload) > self.available_recv_window():
+                    # buffer full: re-ACK last in-order byte with rwnd=0
                     self._send_ack_packet()
+                    return
+                self.buffer_incoming(len(payload))
+                self.recv_queue.append(payload)
+                self.recv_seq += len(payload)
+                self._send_ack_packet()
+            else:
+                self._send_ack_packet()
 
-                continue
+        # ignore other packets (eg pure ACK) in receive loop
 
-            # ignore other packets (eg pure ACK) in receive loop
+    def drain_recv_queue(self) -> int:
+        # non-blocking counterpart of recv_data: hand every queued payload to the app at once, return the byte count
+        drained = 0
+        while self.recv_queue:
+            data = self.recv_queue.popleft()
+            self.consume_recv_buffer(len(data))
+            drained += len(data)
+        if self.zero_window_advertised and self.available_recv_window() > 0:
+            self._send_ack_packet()
+        return drained
 
     def close(self, timeout: float = 1.0, max_retries: int = 5):
         # terminates connection with a FIN/ACK handshake
@@ -319,20 +329,13 @@ class RDTConnection:
             self.channel.close()
             return
 
-        fin_flags = {
-            "SYN": False,
-            "ACK": False,
-            "FIN": True,
-            "DATA": False,
-        }
         fin_seq = self.send_seq
-        fin_packet = make_packet(
+        fin_packet = make_packet_from_template(
+            FIN_TEMPLATE,
             conn_id=self.conn_id,
             seq=fin_seq,
             ack=self.recv_seq,
-            flags=fin_flags,
             rwnd=self.available_recv_window(),
-            payload=b"",
         )
 
         acked = False
@@ -395,12 +398,13 @@ class RDTConnection:
         self.state = "CLOSED"
         self.channel.close()
 
-def client_connect(local_addr: Tuple[str, int],
-                   remote_addr: Tuple[str, int],
+def client_connect(local_addr: tuple[str, int],
+                   remote_addr: tuple[str, int],
                    drop_prob: float = 0.0,
                    corrupt_prob: float = 0.0,
                    timeout:float = 1.0,
                    max_retries: int = 5) -> RDTConnection:
+    import random
 
     channel = UnreliableChannel(local_addr,
                                 drop_prob=drop_prob,
@@ -410,16 +414,11 @@ def client_connect(local_addr: Tuple[str, int],
     conn_id = random.randint(1,1000000) # connect to a random client - conn ids start at 1
     client_isn = random.randint(0,1000000) # starting at a large random number to mimick TCP's robustness
 
-    flags_syn = {"SYN": True, 
-                 "ACK": False,
-                 "FIN": False,
-                 "DATA": False }
-    syn_packet = make_packet(conn_id=conn_id,
-                          seq=client_isn,
-                          ack=0,
-                          flags=flags_syn,
-                          rwnd=0,
-                          payload=b"")        
+    syn_packet = make_packet_from_template(SYN_TEMPLATE,
+                                           conn_id=conn_id,
+                                           seq=client_isn,
+                                           ack=0,
+                                           rwnd=0)
     
     for attempt in range(max_retries):
         print(f"[client] Sending SYN, {attempt+1}")
@@ -438,16 +437,11 @@ def client_connect(local_addr: Tuple[str, int],
             server_isn = header["seq"]
             print(f"[client] Got SYN-ACK from {addr}, server_isn={server_isn}")
 
-            flags_ack = {"SYN": False, 
-                         "ACK": True,
-                         "FIN": False,
-                         "DATA": False}
-            ack_packet = make_packet(conn_id=conn_id,
-                                     seq=client_isn + 1,
-                                     ack=server_isn + 1,
-                                     flags=flags_ack,
-                                     rwnd=0,
-                                     payload=b"")
+            ack_packet = make_packet_from_template(ACK_TEMPLATE,
+                                                   conn_id=conn_id,
+                                                   seq=client_isn + 1,
+                                                   ack=server_isn + 1,
+                                                   rwnd=0)
             print("[client] Sending final ACK, connection established")
             channel.sendto(ack_packet, remote_addr) # send ACK to receiver
 
@@ -463,10 +457,11 @@ def client_connect(local_addr: Tuple[str, int],
     channel.close()
     raise RuntimeError("Handshake failed: exceeded max retries")
 
-def server_accept(local_addr: Tuple[str, int],
+def server_accept(local_addr: tuple[str, int],
                   drop_prob: float = 0.0, # increase later
                   corrupt_prob: float = 0.0, # increase later
                   timeout: float = 2.0):
+    import random
     channel = UnreliableChannel(local_addr,
                                 drop_prob=drop_prob,
                                 corrupt_prob=corrupt_prob)
@@ -493,16 +488,11 @@ def server_accept(local_addr: Tuple[str, int],
             print(f"[server] Received SYN from {addr}, client_isn={client_isn}")
 
             server_isn = random.randint(0, 10000000)
-            flags_synack = {"SYN": True, 
-                            "ACK": True,
-                            "FIN": False,
-                            "DATA": False }
-            synack_packet = make_packet(conn_id=conn_id, # make a SYN-ACK
-                                        seq=server_isn,
-                                        ack=client_isn + 1,
-                                        flags=flags_synack,
-                                        rwnd=0,
-                                        payload=b"")
+            synack_packet = make_packet_from_template(SYNACK_TEMPLATE, # make a SYN-ACK
+                                                      conn_id=conn_id,
+                                                      seq=server_isn,
+                                                      ack=client_isn + 1,
+                                                      rwnd=0)
             print("[server] Sending SYN-ACK")
             channel.sendto(synack_packet, addr) # send SYN-ACK
 
@@ -529,3 +519,159 @@ def server_accept(local_addr: Tuple[str, int],
                     print("[server] Unexpected packet while waiting for final ACK, ignoring.")
         else:
             print("[server] Non-SYN packet in LISTEN state, ignoring.")
+
+
+def _valid_header(header) -> bool:
+    # parse_packet accepts any JSON, so check the shape server_serve relies on before trusting it
+    if not isinstance(header, dict) or not isinstance(header.get("flags"), dict):
+        return False
+    return all(isinstance(header.get(field), int) for field in ("conn_id", "seq", "ack"))
+
+
+def server_serve(local_addr: tuple[str, int],
+                 on_close, # called with a stats dict each time a connection finishes or is dropped
+                 drop_prob: float = 0.0,
+                 corrupt_prob: float = 0.0,
+                 timeout: float = 0.5,
+                 max_retries: int = 5,
+                 idle_timeout: float = 30.0,
+                 reuse_port: bool = False,
+                 recv_buffer_capacity: int = DEFAULT_RECV_BUFFER,
+                 on_ready=None): # called with no arguments once the socket is bound
+    # receive from many senders on one socket, keyed by (addr, conn_id), until interrupted
+    # unlike server_accept this never blocks on a single peer: handshakes, data and teardown
+    # for every connection are driven from the same recvfrom loop, and payloads are consumed as soon as they arrive
+    import random
+    channel = UnreliableChannel(local_addr,
+                                drop_prob=drop_prob,
+                                corrupt_prob=corrupt_prob,
+                                reuse_port=reuse_port)
+    channel.settimeout(timeout)
+    if on_ready is not None:
+        on_ready()
+
+    pending = {} # (addr, conn_id) -> (client_isn, server_isn, synack_packet, last_seen), SYN-ACK sent
+    conns = {} # (addr, conn_id) -> RDTConnection, established or closing
+    stats = {} # (addr, conn_id) -> per-connection counters reported through on_close
+    fin_packets = {} # (addr, conn_id) -> (fin_seq, fin_packet, attempts) for connections in LAST_ACK
+    closed = {} # (addr, conn_id) -> (RDTConnection, closed_at), kept briefly to re-ACK retransmitted FINs (TIME_WAIT)
+
+    def finish(key, complete):
+        closed[key] = (conns.pop(key), time.time())
+        fin_packets.pop(key, None)
+        entry = stats.pop(key)
+        entry["complete"] = complete
+        entry["finished"] = time.time()
+        on_close(entry)
+
+    def send_fin(key, conn):
+        fin_seq, fin_packet, attempts = fin_packets.get(key, (conn.send_seq, None, 0))
+        if fin_packet is None:
+            fin_packet = make_packet_from_template(FIN_TEMPLATE,
+                                                   conn_id=conn.conn_id,
+                                                   seq=fin_seq,
+                                                   ack=conn.recv_seq,
+                                                   rwnd=conn.available_recv_window())
+        channel.sendto(fin_packet, conn.remote_addr)
+        fin_packets[key] = (fin_seq, fin_packet, attempts + 1)
+        conn.state = "LAST_ACK"
+
+    last_sweep = time.time()
+    try:
+        while True:
+            try:
+                raw, addr = channel.recvfrom()
+            except socket.timeout:
+                raw = None
+
+            now = time.time()
+            if now - last_sweep >= timeout:
+                # once per timeout, busy or not: retransmit our FINs and expire peers that went away
+                last_sweep = now
+                for key, (_, _, _, last_seen) in list(pending.items()):
+                    if now - last_seen > timeout * max_retries:
+                        pending.pop(key)
+                for key, (_, closed_at) in list(closed.items()):
+                    if now - closed_at > timeout * max_retries:
+                        closed.pop(key)
+                for key, conn in list(conns.items()):
+                    if key in fin_packets:
+                        if fin_packets[key][2] >= max_retries:
+                            finish(key, complete=True) # peer got all the data, only our FIN went unanswered
+                        else:
+                            send_fin(key, conn)
+                    elif now - stats[key]["last_seen"] > idle_timeout:
+                        finish(key, complete=False)
+
+            if raw is None:
+                continue
+
+            try:
+                header, payload = parse_packet(raw)
+            except ValueError:
+                continue
+
+            if not _valid_header(header):
+                continue # junk from anyone on the shared port must not take the worker down
+
+            flags = header["flags"]
+            key = (addr, header["conn_id"])
+
+            if flags.get("SYN") and not flags.get("ACK"):
+                if key in conns:
+                    continue
+                client_isn = header.get("seq", 0)
+                if key in pending:
+                    _, server_isn, synack_packet, _ = pending[key] # duplicate SYN: our SYN-ACK was lost
+                else:
+                    server_isn = random.randint(0, 10000000)
+                    synack_packet = make_packet_from_template(SYNACK_TEMPLATE,
+                                                              conn_id=key[1],
+                                                              seq=server_isn,
+                                                              ack=client_isn + 1,
+                                                              rwnd=0)
+                pending[key] = (client_isn, server_isn, synack_packet, now)
+                channel.sendto(synack_packet, addr)
+                continue
+
+            if key in closed:
+                if flags.get("FIN"):
+                    closed[key][0].handle_packet(header, payload) # our ACK of the peer's FIN was lost, repeat it
+                continue
+
+            conn = conns.get(key)
+            if conn is None:
+                if key not in pending:
+                    continue
+                client_isn, server_isn, _, _ = pending[key]
+                # the final ACK or, if that was lost, any later packet acknowledging our SYN completes the handshake
+                if header.get("ack") != server_isn + 1:
+                    continue
+                pending.pop(key)
+                conn = RDTConnection(channel=channel,
+                                     remote_addr=addr,
+                                     conn_id=key[1],
+                                     send_seq=server_isn + 1,
+                                     recv_seq=client_isn + 1,
+                                     recv_buffer_capacity=recv_buffer_capacity)
+                conns[key] = conn
+                stats[key] = {"conn_id": key[1], "remote_addr": addr, "bytes": 0, "packets": 0,
+                              "started": now, "last_seen": now}
+
+            entry = stats[key]
+            entry["packets"] += 1
+            entry["last_seen"] = now
+
+            if (key in fin_packets and flags.get("ACK") and not flags.get("DATA")
+                and header.get("ack") == fin_packets[key][0] + 1):
+                finish(key, complete=True)
+                continue
+
+            conn.handle_packet(header, payload)
+            entry["bytes"] += conn.drain_recv_queue()
+
+            if conn.state == "CLOSE_WAIT":
+                # peer's FIN has been ACKed by handle_packet, answer with ours (again, if it retransmitted its FIN)
+                send_fin(key, conn)
+    finally:
+        channel.close()
@@ -0,0 +1,123 @@
+# command-line entry point: send or receive a file over RDT without editing constants in the demo apps
+#
+#   python transfer.py recv --port 9001 --out received.bin
+#   python transfer.py send --host 127.0.0.1 --port 9001 --file message.txt
+#   python transfer.py serve --port 9001 --workers 4   # many senders at once, received data is discarded
+#
+# rdt (and socket/json with it) is only imported once a transfer actually starts,
+# so --help and argument errors return without paying for the protocol stack
+
+import argparse
+import os
+
+CHUNK_SIZE = 64 * 1024 # bytes handed to send_data per call, so large files are not read into memory at once
+
+
+def run_send(args):
+    from rdt import client_connect
+
+    conn = client_connect(
+        local_addr=(args.bind, 0), # 0 = OS picks an ephemeral port
+        remote_addr=(args.host, args.port),
+        drop_prob=args.drop,
+        corrupt_prob=args.corrupt,
+        timeout=args.timeout,
+    )
+    print("[client] Connection established to", conn.remote_addr)
+
+    total_bytes = 0
+    with open(args.file, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            conn.send_data(chunk, timeout=args.timeout, max_retries=args.max_retries)
+            total_bytes += len(chunk)
+
+    print(f"[client] Sent {total_bytes} bytes, closing connection")
+    conn.close(timeout=args.timeout)
+
+
+def run_recv(args):
+    from rdt import server_accept
+
+    conn = server_accept((args.host, args.port), drop_prob=args.drop, corrupt_prob=args.corrupt,
+                         timeout=args.timeout)
+    conn.recv_buffer_capacity = args.buffer
+    print("[server] Now in ESTABLISHED state with", conn.remote_addr)
+
+    total_bytes = 0
+    with open(args.out, "wb") as out:
+        while True:
+            chunk = conn.recv_data(timeout=args.timeout)
+            if chunk is None:
+                continue
+            if chunk == b"":  # FIN received
+                print("[server] FIN received, closing connection")
+                break
+            out.write(chunk)
+            total_bytes += len(chunk)
+
+    conn.close(timeout=args.timeout)
+    print(f"[server] Total bytes received: {total_bytes}")
+
+
+def run_serve(args):
+    from multi_receiver import run_workers
+
+    run_workers((args.host, args.port), args.workers,
+                connections=args.connections,
+                drop_prob=args.drop,
+                corrupt_prob=args.corrupt,
+                timeout=args.timeout,
+                recv_buffer_capacity=args.buffer)
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Transfer a file over the RDT protocol")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    send = sub.add_parser("send", help="connect to a receiver and send a file")
+    send.add_argument("--host", default="127.0.0.1", help="receiver address")
+    send.add_argument("--port", type=int, default=9001, help="receiver port")
+    send.add_argument("--file", required=True, help="path of the file to send")
+    send.add_argument("--bind", default="127.0.0.1", help="local address to send from")
+    send.add_argument("--max-retries", type=int, default=15, help="retransmission attempts before giving up")
+    send.set_defaults(func=run_send)
+
+    recv = sub.add_parser("recv", help="wait for a sender and write what it sends")
+    recv.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    recv.add_argument("--port", type=int, default=9001, help="port to listen on")
+    recv.add_argument("--out", required=True, help="path to write the received file to")
+    recv.add_argument("--buffer", type=int, default=4096, help="receive buffer capacity in bytes (advertised rwnd)")
+    recv.set_defaults(func=run_recv)
+
+    serve = sub.add_parser("serve", help="receive from many senders at once using SO_REUSEPORT worker processes")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve.add_argument("--port", type=int, default=9001, help="port every worker binds")
+    serve.add_argument("--workers", type=positive_int, default=os.cpu_count() or 1, help="worker processes (default: one per core)")
+    serve.add_argument("--connections", type=int, default=None, help="exit after this many connections (default: run until Ctrl+C)")
+    serve.add_argument("--buffer", type=int, default=4096, help="receive buffer capacity per connection in bytes")
+    serve.set_defaults(func=run_serve)
+
+    for p in (send, recv, serve):
+        p.add_argument("--drop", type=float, default=0.0, help="probability of dropping an outgoing packet")
+        p.add_argument("--corrupt", type=float, default=0.0, help="probability of corrupting an outgoing packet")
+        p.add_argument("--timeout", type=float, default=1.0, help="socket timeout in seconds")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()